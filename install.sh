@@ -1,7 +1,10 @@
 #!/bin/bash
 
+# Interpreter used for the virtual environment, e.g. PYTHON=pypy3 ./install.sh
+PYTHON="${PYTHON:-python3}"
+
 # setup virtual environment and activate
-python3 -m venv venv 
+"$PYTHON" -m venv venv 
 source venv/bin/activate
 
 # Install the pip requirements
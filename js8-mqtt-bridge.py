@@ -22,12 +22,38 @@
 ###############################################################################
 
 import socket
-import json
+import selectors
 import time
+import heapq
+import hashlib
+import itertools
 import paho.mqtt.client as mqtt
-from collections import deque
+from collections import deque, OrderedDict, namedtuple
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
 import sys
+import configparser
+import types
+
+# orjson is a CPython-only C extension; under PyPy (or without the wheel) fall back to
+# the standard library, which PyPy's JIT handles well.
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    import json
+    json_loads = json.loads
+    # json.loads raises UnicodeDecodeError (not JSONDecodeError) for invalid UTF-8 bytes;
+    # ValueError covers both, as orjson.JSONDecodeError does
+    JSONDecodeError = ValueError
+
+    def json_dumps(obj):
+        """Serialises obj to compact UTF-8 bytes, matching orjson.dumps."""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
 
 ####### Setup Logging ######
 # Create a logger
@@ -47,69 +73,165 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 file_handler.setFormatter(formatter)
 stream_handler.setFormatter(formatter)
 
-# Add the handlers to the logger
-logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
+# The logger only enqueues records; a background listener thread does the file and
+# console writes so a slow disk never stalls the RX loop
+log_queue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+log_listener.start()
+# Flush queued records on any exit, including failures before main()'s try block
+atexit.register(log_listener.stop)
 logger.info("Starting Logging...")
 
 
 
 # Get all parameters from the config file
-conf = {}
+# Only '=' separates keys from values and only '#' starts a comment, as before; no
+# interpolation so passwords may contain '%'; a repeated key overrides earlier ones
+config = configparser.ConfigParser(delimiters=('=',), comment_prefixes=('#',), interpolation=None, strict=False)
+config.optionxform = str  # Keep key case as written
 with open('js8-mqtt-bridge.cfg', 'r') as file:
-    # Iterate over each line
-    for line in file:
-        line = line.strip()
-        if line and not line.startswith('#'):  # Ignore blank lines and comments
-            key, value = line.split('=', 1)  # Split by the first '=' encountered
-            conf[key.strip()] = value.strip()
+    # The file has no section headers, so parse it as a single section. Lines are
+    # stripped first so indentation is never taken as a continuation of the previous value.
+    config.read_string("[bridge]\n" + "\n".join(line.strip() for line in file))
+conf = types.MappingProxyType(dict(config["bridge"]))  # Read-only from here on
 
-MQTT_BROKER = conf["MQTT_BROKER"].strip()
-MQTT_PORT = conf["MQTT_PORT"].strip()
-MQTT_USERNAME = conf["MQTT_USERNAME"].strip()
-MQTT_PASSWORD = conf["MQTT_PASSWORD"].strip()
-JS8CALL_HOST = conf["JS8CALL_HOST"].strip()
-JS8CALL_PORT = conf["JS8CALL_PORT"].strip()
+# Values are stripped by configparser; ports are converted to int once here
+MQTT_BROKER = conf["MQTT_BROKER"]
+MQTT_PORT = int(conf["MQTT_PORT"])
+MQTT_USERNAME = conf["MQTT_USERNAME"]
+MQTT_PASSWORD = conf["MQTT_PASSWORD"]
+JS8CALL_HOST = conf["JS8CALL_HOST"]
+JS8CALL_PORT = int(conf["JS8CALL_PORT"])
 
 
 TX_DELAY_SECONDS = 15
+# Bytes read per recv() from JS8Call, and the kernel socket buffer sizes requested
+JS8_RECV_SIZE = 65536
+JS8_SOCKET_BUFFER_SIZE = 1 << 20
+# Longest a command send may wait for JS8Call to accept the data
+JS8_SEND_TIMEOUT_SECONDS = 5
 MESSAGE_TIMEOUT_SECONDS = 120
 
+# Deadline math uses time.monotonic_ns(), so keep nanosecond copies of the intervals
+NS_PER_SECOND = 1_000_000_000
+TX_DELAY_NS = TX_DELAY_SECONDS * NS_PER_SECOND
+
+# How many published message IDs are remembered for duplicate suppression
+PUBLISHED_IDS_MAX = 10000
+
+# Maximum number of commands waiting for transmission
+TX_QUEUE_MAX = 256
+# Identical commands received within this window are treated as MQTT retries
+TX_DEDUP_SECONDS = 60
+TX_DEDUP_NS = TX_DEDUP_SECONDS * NS_PER_SECOND
+TX_DEDUP_HISTORY = 128
+
 # --- Global State ---
 JS8_BASE_TOPIC = "js8"
 JS8_RX_COMPLETE_TOPIC = f"{JS8_BASE_TOPIC}/rx/complete"
 JS8_RX_INCOMPLETE_TOPIC = f"{JS8_BASE_TOPIC}/rx/incomplete"
+JS8_TX_COMMAND_TOPIC = f"{JS8_BASE_TOPIC}/tx/command"
+# Shared read-only stand-in for frames without "params"; only ever read with .get()
+_EMPTY = {}
+# Maps JS8Call message types (e.g. RIG.FREQ) to their MQTT topic (e.g. js8/rig/freq)
+topic_cache = {}
 
 js8_socket = None
+# Self-pipe used by the MQTT thread to wake the main loop when a command is queued
+wake_r, wake_w = socket.socketpair()
+wake_r.setblocking(False)
+wake_w.setblocking(False)
 # This buffer is now ONLY for multi-frame query responses (no standard ID)
 message_buffer = {}  
-tx_queue = deque()
-# Set to track IDs of messages that have already been published.
-# This prevents duplicates if RX.DIRECTED arrives before the final RX.ACTIVITY frame.
-published_ids = set()
+# Min-heap of (deadline_ns, buffer_key, version); the main loop sleeps until the earliest
+# deadline and only touches entries that have actually expired
+expiry_heap = []
+tx_queue = deque(maxlen=TX_QUEUE_MAX)
+# Reusable receive area for the JS8Call socket so each recv() does not allocate new bytes
+_rx_buf = bytearray(JS8_RECV_SIZE)
+_rx_view = memoryview(_rx_buf)
+# Source of unique TX _ID values, seeded with wall-clock milliseconds as JS8Call expects
+_id_counter = itertools.count(int(time.time() * 1000))
+# blake2b digest of recent command payloads -> time received, oldest first
+recent_tx_hashes = OrderedDict()
+
+# --- Duplicate Suppression ---
+# (origin, ID) of messages that have already been published, least recently seen first.
+# This prevents duplicates if JS8Call reports the same RX.DIRECTED message more than once.
+published_ids = OrderedDict()
+
+def mark_published(key):
+    """Records key as published. Returns True if it had already been published."""
+    if key in published_ids:
+        published_ids.move_to_end(key)
+        return True
+    published_ids[key] = None
+    if len(published_ids) > PUBLISHED_IDS_MAX:
+        published_ids.popitem(last=False)
+    return False
 
 # --- MQTT Callbacks ---
 def on_connect(client, userdata, flags, rc, properties):
     """The callback for when the client receives a CONNACK response from the server."""
     if rc == 0:
         logger.info("Connected to MQTT Broker!")
+        # Small, latency-sensitive publishes should not wait on Nagle's algorithm
+        mqtt_sock = client.socket()
+        if mqtt_sock is not None:
+            try:
+                mqtt_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except (OSError, AttributeError):
+                pass  # e.g. websocket transport without a plain TCP socket
         # Subscribe to the topic for sending commands to JS8Call
-        client.subscribe(f"{JS8_BASE_TOPIC}/tx/command")
+        client.subscribe(JS8_TX_COMMAND_TOPIC)
     else:
         logger.error(f"Failed to connect, return code {rc}\n")
 
 def on_message(client, userdata, msg):
     """The callback for when a PUBLISH message is received from the server."""
-    logger.debug(f"Received `{msg.payload.decode()}` from `{msg.topic}` topic")
-    if msg.topic == f"{JS8_BASE_TOPIC}/tx/command":
+    # Only decode the payload for the log when DEBUG output is actually enabled
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received `%s` from `%s` topic", msg.payload.decode('utf-8', 'replace'), msg.topic)
+    if msg.topic == JS8_TX_COMMAND_TOPIC:
+        # Drop repeats of a command we have only just queued (e.g. a client retrying a publish)
+        tx_hash = hashlib.blake2b(msg.payload, digest_size=8).digest()
+        now = time.monotonic_ns()
+        last_received = recent_tx_hashes.get(tx_hash)
+        if last_received is not None and now - last_received < TX_DEDUP_NS:
+            logger.info("Duplicate command ignored.")
+            return
+        recent_tx_hashes[tx_hash] = now
+        recent_tx_hashes.move_to_end(tx_hash)
+        if len(recent_tx_hashes) > TX_DEDUP_HISTORY:
+            recent_tx_hashes.popitem(last=False)
+
+        if len(tx_queue) == tx_queue.maxlen:
+            logger.warning("TX queue is full. Dropping the oldest command.")
         try:
             # We add the raw JSON string to the queue; it's parsed later.
             tx_queue.append(msg.payload.decode())
             logger.info("Command added to queue.")
-        except json.JSONDecodeError:
-            logger.error(f"Failed to decode JSON payload: {msg.payload.decode()}")
+            try:
+                wake_w.send(b"\x00")
+            except BlockingIOError:
+                pass  # Wake-up already pending, the main loop will see the queue
+        except UnicodeDecodeError:
+            logger.error(f"Command payload is not valid UTF-8: {msg.payload!r}")
 
 # --- JS8Call API Functions ---
+def tune_js8call_socket(sock):
+    """Disables Nagle and enables TCP keepalive so a dead JS8Call is noticed in seconds."""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Probe after 30s idle, every 10s, give up after 3 misses (not available on every platform)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+    if hasattr(socket, "TCP_KEEPCNT"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
 def connect_js8call():
     """Continuously retries the connection to the JS8Call API until successful."""
     global js8_socket
@@ -118,15 +240,150 @@ def connect_js8call():
         try:
             logger.info("Attempting to connect to JS8Call...")
             js8_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            js8_socket.settimeout(1)  # Increase timeout for better stability
-            js8_socket.connect((JS8CALL_HOST, int(JS8CALL_PORT)))
+            # Set before connect() so the TCP window is negotiated with the larger buffer
+            js8_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, JS8_SOCKET_BUFFER_SIZE)
+            js8_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, JS8_SOCKET_BUFFER_SIZE)
+            js8_socket.connect((JS8CALL_HOST, JS8CALL_PORT))
+            tune_js8call_socket(js8_socket)
+            # The main loop waits on a selector, so reads must never block
+            js8_socket.setblocking(False)
             logger.info("Connected to JS8Call API")
             return True  # Exit the function on success
         except (socket.error, Exception) as e:
             logger.error(f"Error connecting to JS8Call: {e}. Retrying in 5 seconds...")
-            js8_socket.close() # Ensure socket is closed before next attempt
+            # Ensure socket is closed before next attempt; it may not exist if socket() itself failed
+            if js8_socket is not None:
+                try:
+                    js8_socket.close()
+                except Exception:
+                    pass
+                js8_socket = None
             time.sleep(5)  # Wait before retrying to avoid excessive CPU usage
 
+def reconnect_js8call(sel):
+    """Replaces a failed JS8Call connection and registers the new socket with sel."""
+    sel.unregister(js8_socket)
+    try:
+        js8_socket.close()
+    except OSError:
+        pass
+    connect_js8call()
+    sel.register(js8_socket, selectors.EVENT_READ)
+
+def send_js8call(payload):
+    """Sends one newline-terminated JSON command to JS8Call."""
+    data = json_dumps(payload)
+    # Reads stay non-blocking for the selector, but a send waits (up to a limit) for
+    # buffer space instead of failing with BlockingIOError when JS8Call is slow to read
+    js8_socket.settimeout(JS8_SEND_TIMEOUT_SECONDS)
+    try:
+        if hasattr(js8_socket, "sendmsg"):
+            # Let the kernel gather the payload and newline instead of concatenating them
+            sent = js8_socket.sendmsg([data, b'\n'])
+            if sent < len(data) + 1:
+                js8_socket.sendall((data + b'\n')[sent:])
+        else:
+            # No sendmsg on Windows
+            js8_socket.sendall(data + b'\n')
+    finally:
+        js8_socket.setblocking(False)
+
+# --- JS8Call Frame Handlers ---
+# Per-read state shared by the frame handlers: the receive time and the publishes to issue.
+# Handlers are called as handler(js8_message, raw, ctx) where raw is the undecoded JSON line.
+FrameContext = namedtuple('FrameContext', ['now_ns', 'pending_pubs'])
+
+def handle_rx_activity(js8_message, raw, ctx):
+    """Buffers RX.ACTIVITY frames that make up a multi-frame query response."""
+    params = js8_message.get("params") or _EMPTY
+    message_id = params.get("ID")
+    snr = params.get("SNR")
+    origin = params.get("ORIGIN")
+    text_content = params.get("TEXT", "")
+    logger.debug(text_content)
+
+    # Ignore RX.ACTIVITY for directed messages
+    if message_id is not None:
+        logger.debug("Ignoring RX.ACTIVITY frame with ID '%s' as we wait for RX.DIRECTED.", message_id)
+        return
+
+    # Only buffer messages that do NOT have a standard message ID
+    if origin:
+        logger.debug("Buffering RX.ACTIVITY frame from '%s' as a query response.", origin)
+        buffer_key = origin
+        
+        if buffer_key not in message_buffer:
+            message_buffer[buffer_key] = {
+                'id': None,  
+                'origin': origin,  
+                'text_parts': [],  # Joined once when the message is published
+                'heartbeat': False,
+                'version': 0,  # Bumped on every frame so older heap entries can be skipped
+                'snr':snr,
+                'last_seen': ctx.now_ns
+            }
+        
+        msg_data = message_buffer[buffer_key]
+        text_parts = msg_data['text_parts']
+        # Keep the end of the previous frame in case a marker straddles two frames
+        recent_text = (text_parts[-1][-8:] if text_parts else '') + text_content
+        text_parts.append(text_content)
+        msg_data['last_seen'] = ctx.now_ns
+
+        # Use longer timeout for heartbeat messages (they often have grid info in later frames)
+        if '@HB' in recent_text or 'HEARTBEAT' in recent_text:
+            msg_data['heartbeat'] = True
+        if msg_data['heartbeat']:
+            timeout_duration = 10 * NS_PER_SECOND  # Longer timeout for heartbeat messages
+        else:
+            timeout_duration = 3 * NS_PER_SECOND  # Standard timeout for other query responses
+        msg_data['version'] += 1
+        heapq.heappush(expiry_heap, (ctx.now_ns + timeout_duration, buffer_key, msg_data['version']))
+
+def handle_rx_directed(js8_message, raw, ctx):
+    """Publishes the final, fully reassembled message from JS8Call."""
+    params = js8_message.get("params") or _EMPTY
+    message_id = params.get("ID")
+    snr = params.get("SNR")
+    origin = params.get("ORIGIN", "")
+
+    if message_id is not None and mark_published((origin, message_id)):
+        logger.debug("Ignoring duplicate RX.DIRECTED message with ID '%s'.", message_id)
+        return
+
+    logger.info(f"Received definitive RX.DIRECTED message with ID '{message_id}'. Publishing now.")
+    
+    complete_message = {
+        "id": message_id,
+        "text": js8_message.get("value", ""),
+        "snr": snr,
+        "origin": origin,
+        "complete": True
+    }
+    logger.debug(complete_message)
+    ctx.pending_pubs.append((JS8_RX_COMPLETE_TOPIC, json_dumps(complete_message)))
+    logger.info(f"Queued complete message from RX.DIRECTED for publishing: {complete_message['text']}")
+
+def handle_other(js8_message, raw, ctx):
+    """Publishes all other message types to a topic derived from the type.
+
+    The frame is forwarded as the exact JSON line JS8Call sent (raw) rather than
+    being serialised again from the parsed dict.
+    """
+    message_type = js8_message.get("type", "unknown")
+    logger.debug("Received other message type: %s. Publishing to dynamic topic.", message_type)
+    dynamic_topic = topic_cache.get(message_type)
+    if dynamic_topic is None:
+        dynamic_topic = f"{JS8_BASE_TOPIC}/{message_type.replace('.', '/').lower()}"
+        topic_cache[message_type] = dynamic_topic
+    ctx.pending_pubs.append((dynamic_topic, raw))
+
+# Message types with dedicated handling; everything else goes to handle_other
+HANDLERS = {
+    "RX.ACTIVITY": handle_rx_activity,
+    "RX.DIRECTED": handle_rx_directed,
+}
+
 # --- Main Logic ---
 def main():
     if not connect_js8call():
@@ -137,24 +394,34 @@ def main():
     mqtt_client.on_message = on_message
    
     mqtt_client.username_pw_set(username=MQTT_USERNAME, password=MQTT_PASSWORD)
-    mqtt_client.connect(MQTT_BROKER, int(MQTT_PORT), 60)
+    mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
     mqtt_client.loop_start()
 
     logger.info("js8call monitoring running...")
-    buffer = ""
-    last_timeout_check = time.time()
-    last_tx_time = time.time()
+    # Local aliases for names used on every frame (local lookups are cheaper than globals)
+    loads = json_loads
+    dumps = json_dumps
+    publish = mqtt_client.publish
+    rx_complete_topic = JS8_RX_COMPLETE_TOPIC
+    # Raw bytes from JS8Call; only complete lines are ever decoded
+    buffer = bytearray()
+    last_tx_time = time.monotonic_ns()
+
+    # Wait on both the JS8Call socket and the wake-up pipe instead of polling
+    sel = selectors.DefaultSelector()
+    sel.register(js8_socket, selectors.EVENT_READ)
+    sel.register(wake_r, selectors.EVENT_READ)
 
     try:
         while True:
-            current_time = time.time()
+            now_ns = time.monotonic_ns()
 
             # Command queue processing
             # Check if there are commands to send and if the TX delay has passed
-            if tx_queue and current_time - last_tx_time > TX_DELAY_SECONDS:
+            if tx_queue and now_ns - last_tx_time > TX_DELAY_NS:
                 command_payload_str = tx_queue.popleft()
                 try:
-                    command_payload = json.loads(command_payload_str)
+                    command_payload = loads(command_payload_str)
                     logger.info(f"Processing command from queue: {command_payload}")
                     logger.debug(command_payload_str)
 
@@ -165,121 +432,113 @@ def main():
                             "type": "TX.SEND_MESSAGE",
                             "value": command_payload["message"],
                             "params": {
-                                "_ID": int(time.time() * 1000)
+                                "_ID": next(_id_counter)
                             }
                         }
                         
-                        js8_payload_str = json.dumps(js8_payload) + '\n'
-                        js8_socket.sendall(js8_payload_str.encode('utf-8'))
-                        last_tx_time = current_time
+                        send_js8call(js8_payload)
+                        last_tx_time = now_ns
                     else:
                         logger.warning("Command payload did not contain a 'message' key.")
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     logger.error(f"Failed to parse JSON from TX queue: {command_payload_str}")
+                except OSError as e:
+                    # Part of the line may already be written, so the stream can't be reused
+                    logger.error(f"Failed to send command to JS8Call: {e}. Reconnecting...")
+                    reconnect_js8call(sel)
+                    buffer = bytearray()  # Drop the partial line from the old connection
 
 
             # Message timeout check for query responses
-            if current_time - last_timeout_check > 5:
-                last_timeout_check = current_time
-                timed_out_keys = []
-                for msg_key, msg_data in message_buffer.items():
-                    # This check is ONLY for query responses
-                    # Use longer timeout for heartbeat messages (they often have grid info in later frames)
-                    text_content = msg_data.get('text', '')
-                    if '@HB' in text_content or 'HEARTBEAT' in text_content:
-                        timeout_duration = 10  # Longer timeout for heartbeat messages
-                    else:
-                        timeout_duration = 3  # Standard timeout for other query responses
-                    
-                    if current_time - msg_data['last_seen'] > timeout_duration:
-                        timed_out_keys.append(msg_key)
+            while expiry_heap and expiry_heap[0][0] <= now_ns:
+                _, msg_key, version = heapq.heappop(expiry_heap)
+                msg_data = message_buffer.get(msg_key)
+                # Skip heap entries superseded by a later frame from the same origin
+                if msg_data is None or msg_data['version'] != version:
+                    continue
+
+                message_id = msg_data['origin'] # Use origin as ID for query responses
+
+                logger.info(f"Query response from {msg_data['origin']} timed out. Publishing as complete.")
+                complete_message = {
+                    "id": message_id,
+                    "text": "".join(msg_data['text_parts']),
+                    "origin": msg_data['origin'],
+                    "complete": True
+                }
+                publish(rx_complete_topic, dumps(complete_message), qos=0)
                 
-                for msg_key in timed_out_keys:
-                    msg_data = message_buffer[msg_key]
-                    message_id = msg_data['origin'] # Use origin as ID for query responses
-
-                    logger.info(f"Query response from {msg_data['origin']} timed out. Publishing as complete.")
-                    complete_message = {
-                        "id": message_id,
-                        "text": msg_data['text'],
-                        "origin": msg_data['origin'],
-                        "complete": True
-                    }
-                    mqtt_client.publish(JS8_RX_COMPLETE_TOPIC, json.dumps(complete_message), qos=0)
-                    
-                    del message_buffer[msg_key]
-
-            # Receive and process messages from JS8Call
-            try:
-                data = js8_socket.recv(1024)
-                if data:
-                    buffer += data.decode('utf-8')
-                    while '\n' in buffer:
-                        message, buffer = buffer.split('\n', 1)
-                        try:
-                            js8_message = json.loads(message)
-                            message_type = js8_message.get("type", "unknown")
-                            
-                            if message_type == "RX.ACTIVITY":
-                                message_id = js8_message.get("params", {}).get("ID")
-                                snr = js8_message.get("params", {}).get("SNR")
-                                origin = js8_message.get("params", {}).get("ORIGIN")
-                                text_content = js8_message.get("params", {}).get("TEXT", "")
-                                logger.debug(text_content)
-
-                                # Ignore RX.ACTIVITY for directed messages
-                                if message_id is not None:
-                                    logger.debug(f"Ignoring RX.ACTIVITY frame with ID '{message_id}' as we wait for RX.DIRECTED.")
-                                    continue
-
-                                # Only buffer messages that do NOT have a standard message ID
-                                if origin:
-                                    logger.debug(f"Buffering RX.ACTIVITY frame from '{origin}' as a query response.")
-                                    buffer_key = origin
-                                    
-                                    if buffer_key not in message_buffer:
-                                        message_buffer[buffer_key] = {
-                                            'id': None,  
-                                            'origin': origin,  
-                                            'text': '',  
-                                            'snr':snr,
-                                            'last_seen': current_time
-                                        }
-                                    
-                                    message_buffer[buffer_key]['text'] += text_content
-                                    message_buffer[buffer_key]['last_seen'] = current_time
-
-                            elif message_type == "RX.DIRECTED":
-                                # This is the final, fully reassembled message from JS8Call.
-                                message_id = js8_message.get("params", {}).get("ID")
-                                snr = js8_message.get("params", {}).get("SNR")
-                                logger.info(f"Received definitive RX.DIRECTED message with ID '{message_id}'. Publishing now.")
-                                
-                                complete_message = {
-                                    "id": message_id,
-                                    "text": js8_message.get("value", ""),
-                                    "snr": snr,
-                                    "origin": js8_message.get("params", {}).get("ORIGIN", ""),
-                                    "complete": True
-                                }
-                                logger.debug(complete_message)
-                                mqtt_client.publish(JS8_RX_COMPLETE_TOPIC, json.dumps(complete_message), qos=0)
-                                logger.info(f"Published complete message from RX.DIRECTED: {complete_message['text']}")
-                                
-                            else:
-                                # All other message types
-                                logger.debug(f"Received other message type: {message_type}. Publishing to dynamic topic.")
-                                dynamic_topic = f"{JS8_BASE_TOPIC}/{message_type.replace('.', '/').lower()}"
-                                mqtt_client.publish(dynamic_topic, json.dumps(js8_message), qos=0)
-
-                        except json.JSONDecodeError:
-                            logger.error(f"Failed to decode JSON: {message}")
-            except socket.timeout:
-                pass
+                del message_buffer[msg_key]
+
+            # Sleep until the socket is readable, a command is queued, or the next deadline.
+            # With nothing buffered or queued there is no deadline and we wait for I/O only.
+            next_deadline = expiry_heap[0][0] if expiry_heap else None
+            if tx_queue:
+                tx_deadline = last_tx_time + TX_DELAY_NS
+                next_deadline = tx_deadline if next_deadline is None else min(next_deadline, tx_deadline)
+            if next_deadline is None:
+                timeout = None
+            else:
+                timeout = max(0, next_deadline - time.monotonic_ns()) / NS_PER_SECOND
+            events = sel.select(timeout=timeout)
+            now_ns = time.monotonic_ns()
+
+            for key, _ in events:
+                if key.fileobj is wake_r:
+                    # Drain the wake-up bytes; the queue itself is checked at the top of the loop
+                    try:
+                        while wake_r.recv(1024):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+
+                # Receive and process messages from JS8Call
+                # Read everything available so a burst of frames costs a single wake-up
+                connection_lost = False
+                while True:
+                    try:
+                        n = js8_socket.recv_into(_rx_buf)
+                    except BlockingIOError:
+                        break
+                    except OSError:
+                        # Reset, keepalive timeout (ETIMEDOUT), unreachable host, ...: reconnect
+                        n = 0
+
+                    if not n:
+                        connection_lost = True
+                        break
+
+                    buffer += _rx_view[:n]
+
+                # Walk the complete lines with a read index and drop the consumed prefix once
+                start = 0
+                # Publishes from this drain are issued back-to-back once all lines are parsed
+                pending_pubs = []
+                ctx = FrameContext(now_ns, pending_pubs)
+                while (end := buffer.find(b'\n', start)) != -1:
+                    message = buffer[start:end]
+                    start = end + 1
+                    try:
+                        js8_message = loads(message)
+                        HANDLERS.get(js8_message.get("type", "unknown"), handle_other)(js8_message, message, ctx)
+                    except JSONDecodeError:
+                        logger.error(f"Failed to decode JSON: {message.decode('utf-8', 'replace')}")
+                del buffer[:start]
+
+                for topic, payload in pending_pubs:
+                    publish(topic, payload, qos=0)
+
+                # Reconnect only after the complete lines received before the close were handled
+                if connection_lost:
+                    logger.error("Connection to JS8Call lost. Reconnecting...")
+                    reconnect_js8call(sel)
+                    buffer = bytearray()  # Drop the partial line from the old connection
 
     except KeyboardInterrupt:
         logger.info("Shutting down...")
     finally:
+        sel.close()
         if js8_socket:
             js8_socket.close()
         mqtt_client.loop_stop()